@@ -0,0 +1,394 @@
+import os
+import logging
+import time
+from collections import OrderedDict
+from email import policy
+from email.parser import BytesParser
+from dotenv import load_dotenv
+import requests
+from requests.adapters import HTTPAdapter
+import asyncio
+import aiohttp
+import orjson
+import xxhash
+from cachetools import LRUCache
+from diskcache import Cache
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+# One HTML stripper for the whole backend (selectolax, with a regex fallback)
+from utils.html_utils import strip_html_tags
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# One parser reused for every .eml (message_from_bytes builds a new one per call)
+_EML_PARSER = BytesParser(policy=policy.default)
+
+# Parsed .eml text keyed by a hash of the raw bytes
+_parsed_cache = LRUCache(maxsize=int(os.getenv("PARSED_EML_CACHE_SIZE", 256)))
+
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "meta-llama/llama-3.1-8b-instruct")
+OPENROUTER_SITE_URL = os.getenv("OPENROUTER_SITE_URL", "http://localhost:5173")
+OPENROUTER_APP_TITLE = os.getenv("OPENROUTER_APP_TITLE", "Email Summarizer App")
+
+# Request constants, built once at import instead of per call
+_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+_STATIC_HEADERS = {
+    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+    "Content-Type": "application/json",
+    "HTTP-Referer": OPENROUTER_SITE_URL,
+    "X-Title": OPENROUTER_APP_TITLE,
+}
+
+# Caps concurrent OpenRouter calls across every agent
+_openrouter_semaphore = asyncio.Semaphore(int(os.getenv("OPENROUTER_MAX_CONCURRENCY", 20)))
+
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", 30))
+
+# Shared requests session for the sync path (keeps TLS connections alive)
+_requests_session = requests.Session()
+_requests_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+_requests_session.headers.update(_STATIC_HEADERS)
+
+# Shared aiohttp session (created once, reused by every agent)
+_aiohttp_session = None
+_session_lock = asyncio.Lock()
+
+
+async def get_aiohttp_session():
+    """Get or create shared aiohttp session (double-checked, so a burst creates only one)"""
+    global _aiohttp_session
+    if _aiohttp_session is None or _aiohttp_session.closed:
+        async with _session_lock:
+            if _aiohttp_session is None or _aiohttp_session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=50,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=75,
+                )
+                _aiohttp_session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=90),
+                    headers=_STATIC_HEADERS,
+                )
+    return _aiohttp_session
+
+
+async def close_aiohttp_session():
+    """Close shared aiohttp session"""
+    global _aiohttp_session
+    async with _session_lock:
+        if _aiohttp_session and not _aiohttp_session.closed:
+            await _aiohttp_session.close()
+        _aiohttp_session = None
+
+
+# ============================================================================
+# EMAIL PARSING
+# ============================================================================
+
+def parse_eml(raw_bytes: bytes) -> str:
+    """Optimized email parsing - prioritizes plain text over HTML; repeated .eml files skip re-parsing"""
+    key = xxhash.xxh3_64_intdigest(raw_bytes)
+    text = _parsed_cache.get(key)
+    if text is None:
+        text = _parsed_cache[key] = _parse_eml_uncached(raw_bytes)
+    return text
+
+
+def _parse_eml_uncached(raw_bytes: bytes) -> str:
+    msg = _EML_PARSER.parsebytes(raw_bytes)
+
+    if msg.is_multipart():
+        # Single pass over text leaves in document order: stop at the first plain text part,
+        # remember the first HTML part
+        plain, html = None, None
+        stack = list(reversed(list(msg.iter_parts())))
+        while stack:
+            part = stack.pop()
+            if part.is_multipart():
+                stack.extend(reversed(list(part.iter_parts())))
+                continue
+            if part.get_content_maintype() != "text":
+                continue
+
+            content_type = part.get_content_type()
+            if content_type != "text/plain" and (content_type != "text/html" or html):
+                continue
+
+            content_disposition = str(part.get("Content-Disposition", ""))
+            if "attachment" in content_disposition:
+                continue
+
+            try:
+                payload = part.get_payload(decode=True)
+                if not payload:
+                    continue
+                text = payload.decode(errors="ignore").strip()
+            except Exception:
+                continue
+
+            if not text:
+                continue
+            if content_type == "text/plain":
+                plain = text
+                break
+            html = text
+
+        # Fall back to HTML if no plain text found
+        if plain:
+            return plain
+        if html:
+            return strip_html_tags(html)
+    else:
+        # Single part message
+        try:
+            payload = msg.get_payload(decode=True)
+            if payload:
+                text = payload.decode(errors="ignore").strip()
+                if text:
+                    # Check if it's HTML
+                    if msg.get_content_type() == "text/html":
+                        return strip_html_tags(text)
+                    return text
+        except Exception:
+            pass
+
+    return ""
+
+
+# ============================================================================
+# CACHING
+# ============================================================================
+
+def get_cache_key(email_text: str) -> int:
+    """Generate cache key from email content hash (non-cryptographic)"""
+    return xxhash.xxh3_64_intdigest(email_text.encode())
+
+
+def truncate_email(email_text: str, max_chars: int = 2000) -> str:
+    """Truncate very long emails to reduce tokens and API cost, preferring a paragraph/sentence boundary"""
+    if len(email_text) <= max_chars:
+        return email_text
+    cut = email_text.rfind("\n\n", 0, max_chars)
+    if cut <= max_chars // 2:
+        cut = email_text.rfind(". ", 0, max_chars) + 1  # keep the period
+    if cut <= max_chars // 2:
+        cut = max_chars
+    return email_text[:cut] + "\n\n[Email truncated...]"
+
+
+class ResultCache:
+    """
+    Per-agent result cache:
+    - bounded in-memory LRU
+    - persistent disk tier so results survive restarts
+    - short-lived negative cache of recent failures (keeps outages out of a hot retry loop)
+    - in-flight tasks, so concurrent requests for one email share a single call
+    """
+
+    def __init__(self, maxsize: int, directory: str, ttl: int):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.disk = Cache(directory)
+        self.ttl = ttl
+        self.negative: OrderedDict[int, tuple[float, str]] = OrderedDict()
+        self.inflight: dict[int, asyncio.Task] = {}
+
+    def get(self, cache_key: int) -> str | None:
+        """Return a cached result (or recent error message), or None on a miss"""
+        if cache_key in self.memory:
+            return self.memory[cache_key]
+        cached = self.disk.get(cache_key)
+        if cached is not None:
+            self.memory[cache_key] = cached
+            return cached
+        return self._get_negative(cache_key)
+
+    def set(self, cache_key: int, content: str):
+        self.memory[cache_key] = content
+        self.disk.set(cache_key, content, expire=self.ttl)
+
+    async def get_async(self, cache_key: int) -> str | None:
+        """get() for async callers: the SQLite-backed disk tier is read off the event loop"""
+        if cache_key in self.memory:
+            return self.memory[cache_key]
+        cached = await asyncio.to_thread(self.disk.get, cache_key)
+        if cached is not None:
+            self.memory[cache_key] = cached
+            return cached
+        return self._get_negative(cache_key)
+
+    async def set_async(self, cache_key: int, content: str):
+        """set() for async callers: the disk write runs off the event loop"""
+        self.memory[cache_key] = content
+        await asyncio.to_thread(self.disk.set, cache_key, content, expire=self.ttl)
+
+    def set_error(self, cache_key: int, error_msg: str):
+        """Remember a failed email for NEGATIVE_CACHE_TTL seconds"""
+        self.negative[cache_key] = (time.monotonic() + NEGATIVE_CACHE_TTL, error_msg)
+        self.negative.move_to_end(cache_key)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+        self.negative.clear()
+
+    def _get_negative(self, cache_key: int) -> str | None:
+        """Return the cached error for a recently failed email, evicting expired entries"""
+        now = time.monotonic()
+        while self.negative:
+            expires, _ = next(iter(self.negative.values()))
+            if expires > now:
+                break
+            self.negative.popitem(last=False)
+        entry = self.negative.get(cache_key)
+        return entry[1] if entry else None
+
+
+# ============================================================================
+# OPENROUTER REQUESTS
+# ============================================================================
+
+async def _read_content(resp: aiohttp.ClientResponse) -> str:
+    data = orjson.loads(await resp.read())
+    return data["choices"][0]["message"]["content"]
+
+
+def _is_retryable(e: BaseException) -> bool:
+    """Rate limits and server errors are worth retrying; other failures are not"""
+    return isinstance(e, aiohttp.ClientResponseError) and (e.status == 429 or e.status >= 500)
+
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_random_exponential(min=1, max=16),
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+async def request_async(messages: list[dict], max_tokens: int = 100, read_response=_read_content, **extra) -> str:
+    """
+    POST one chat completion to OpenRouter and return the reply text.
+    Bounded by the shared concurrency cap (released while backing off on 429/5xx); raises on failure.
+    """
+    async with _openrouter_semaphore:
+        session = await get_aiohttp_session()  # Get shared session
+
+        async with session.post(
+            _API_URL,
+            data=orjson.dumps({
+                "model": OPENROUTER_MODEL,
+                "messages": messages,
+                "temperature": 0.2,
+                "max_tokens": max_tokens,
+                **extra,
+            }),
+        ) as resp:
+            resp.raise_for_status()
+            return await read_response(resp)
+
+
+def request_sync(messages: list[dict], max_tokens: int = 100) -> str:
+    """Synchronous request_async; raises on failure"""
+    resp = _requests_session.post(
+        _API_URL,
+        data=orjson.dumps({
+            "model": OPENROUTER_MODEL,
+            "messages": messages,
+            "temperature": 0.2,
+            "max_tokens": max_tokens,
+        }),
+        timeout=90,  # Increased timeout
+    )
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+    return data["choices"][0]["message"]["content"]
+
+
+async def call_async(
+    email_text: str,
+    cache: ResultCache,
+    system_msg: dict,
+    prompt_prefix: str,
+    prompt_suffix: str,
+    error_label: str,
+    **request_kwargs,
+) -> str:
+    """
+    Cached, single-flight OpenRouter call for one email.
+    Returns "<error_label> unavailable (...)" instead of raising.
+    """
+    if not email_text.strip():
+        return ""
+
+    # Check cache first
+    cache_key = get_cache_key(email_text)
+    cached = await cache.get_async(cache_key)
+    if cached is not None:
+        return cached
+
+    # Share one OpenRouter call between concurrent requests for the same email
+    task = cache.inflight.get(cache_key)
+    if task is None:
+        user_prompt = prompt_prefix + truncate_email(email_text) + prompt_suffix
+        messages = [system_msg, {"role": "user", "content": user_prompt}]
+        task = asyncio.ensure_future(
+            _request_cached_async(messages, cache, cache_key, error_label, request_kwargs)
+        )
+        cache.inflight[cache_key] = task
+        task.add_done_callback(lambda _: cache.inflight.pop(cache_key, None))
+    return await asyncio.shield(task)
+
+
+async def _request_cached_async(
+    messages: list[dict],
+    cache: ResultCache,
+    cache_key: int,
+    error_label: str,
+    request_kwargs: dict,
+) -> str:
+    try:
+        content = (await request_async(messages, **request_kwargs)).strip()
+    except Exception as e:
+        error_msg = f"{error_label} unavailable (OpenRouter error: {e})"
+        cache.set_error(cache_key, error_msg)
+        logger.exception("OpenRouter error")
+        return error_msg
+
+    # Cache the result
+    await cache.set_async(cache_key, content)
+    return content
+
+
+def call_sync(
+    email_text: str,
+    cache: ResultCache,
+    system_msg: dict,
+    prompt_prefix: str,
+    prompt_suffix: str,
+    error_label: str,
+) -> str:
+    """Synchronous call_async (no single-flight)"""
+    if not email_text.strip():
+        return ""
+
+    # Check cache first
+    cache_key = get_cache_key(email_text)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    user_prompt = prompt_prefix + truncate_email(email_text) + prompt_suffix
+    try:
+        content = request_sync([system_msg, {"role": "user", "content": user_prompt}]).strip()
+    except Exception as e:
+        error_msg = f"{error_label} unavailable (OpenRouter error: {e})"
+        cache.set_error(cache_key, error_msg)
+        logger.exception("OpenRouter error")
+        return error_msg
+
+    # Cache the result
+    cache.set(cache_key, content)
+    return content
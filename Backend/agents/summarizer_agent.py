@@ -1,99 +1,29 @@
 import os
-import re
-import email
-from email import policy
-from dotenv import load_dotenv
-import requests
+import logging
 import asyncio
-import aiohttp
-import hashlib
-
-load_dotenv()
-
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "meta-llama/llama-3.1-8b-instruct")
-OPENROUTER_SITE_URL = os.getenv("OPENROUTER_SITE_URL", "http://localhost:5173")
-OPENROUTER_APP_TITLE = os.getenv("OPENROUTER_APP_TITLE", "Email Summarizer App")
-
-# Simple in-memory cache
-_summary_cache = {}
-
-# Shared aiohttp session (created once, reused many times)
-_aiohttp_session = None
-
-
-async def get_aiohttp_session():
-    """Get or create shared aiohttp session"""
-    global _aiohttp_session
-    if _aiohttp_session is None or _aiohttp_session.closed:
-        _aiohttp_session = aiohttp.ClientSession()
-    return _aiohttp_session
-
-
-async def close_aiohttp_session():
-    """Close shared aiohttp session"""
-    global _aiohttp_session
-    if _aiohttp_session and not _aiohttp_session.closed:
-        await _aiohttp_session.close()
-        _aiohttp_session = None
-
-
-def strip_html_tags(html: str) -> str:
-    clean = re.compile(r"<.*?>")
-    return re.sub(clean, "", html)
-
-
-def parse_eml(raw_bytes: bytes) -> str:
-    """Optimized email parsing"""
-    msg = email.message_from_bytes(raw_bytes, policy=policy.default)
-    
-    if msg.is_multipart():
-        for part in msg.iter_parts():
-            content_type = part.get_content_type()
-            content_disposition = str(part.get("Content-Disposition", ""))
-            
-            if "attachment" in content_disposition:
-                continue
-            
-            if content_type == "text/plain":
-                try:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        text = payload.decode(errors="ignore").strip()
-                        if text:
-                            return text
-                except Exception:
-                    pass
-        
-        for part in msg.iter_parts():
-            content_type = part.get_content_type()
-            content_disposition = str(part.get("Content-Disposition", ""))
-            
-            if "attachment" in content_disposition:
-                continue
-            
-            if content_type == "text/html":
-                try:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        html = payload.decode(errors="ignore").strip()
-                        if html:
-                            return strip_html_tags(html)
-                except Exception:
-                    pass
-    else:
-        try:
-            payload = msg.get_payload(decode=True)
-            if payload:
-                text = payload.decode(errors="ignore").strip()
-                if text:
-                    if msg.get_content_type() == "text/html":
-                        return strip_html_tags(text)
-                    return text
-        except Exception:
-            pass
-    
-    return ""
+import orjson
+
+from ._openrouter_client import (
+    ResultCache,
+    call_async,
+    call_sync,
+    close_aiohttp_session,
+    get_aiohttp_session,
+    get_cache_key,
+    parse_eml,
+    request_async,
+    strip_html_tags,
+    truncate_email,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bounded in-memory LRU + persistent disk cache (survives restarts)
+_summary_cache = ResultCache(
+    maxsize=int(os.getenv("SUMMARY_CACHE_SIZE", 10_000)),
+    directory=os.getenv("SUMMARY_DISK_CACHE", "/tmp/summ_cache"),
+    ttl=int(os.getenv("SUMMARY_CACHE_TTL", 86400)),
+)
 
 
 SUMMARY_SYSTEM_PROMPT = (
@@ -102,17 +32,18 @@ SUMMARY_SYSTEM_PROMPT = (
     "Limit answer to 50 words. Do not return anything other than the summary, especially not something like ('Here is the summary.....')"
 )
 
+_SYSTEM_MSG = {"role": "system", "content": SUMMARY_SYSTEM_PROMPT}
 
-def get_cache_key(email_text: str) -> str:
-    """Generate cache key from email content hash"""
-    return hashlib.md5(email_text.encode()).hexdigest()
-
-
-def truncate_email(email_text: str, max_chars: int = 2000) -> str:
-    """Truncate very long emails to reduce tokens and API cost"""
-    if len(email_text) > max_chars:
-        return email_text[:max_chars] + "\n\n[Email truncated...]"
-    return email_text
+# Only the email body is substituted per request
+_USER_PROMPT_PREFIX = (
+    "Summarize the following email in clear and concise bullet points. Do not return anything other than the summary, especially not something like ('Here is the summary.....')\n\n"
+    "Email:\n"
+)
+_SYNC_USER_PROMPT_PREFIX = (
+    "Summarize the following email in clear and concise bullet points. Do not return anything other than the summary please. \n\n"
+    "Email:\n"
+)
+_USER_PROMPT_SUFFIX = "\n\nSummary:"
 
 
 # ============================================================================
@@ -121,58 +52,15 @@ def truncate_email(email_text: str, max_chars: int = 2000) -> str:
 
 async def summarizer_async(email_text: str) -> str:
     """Async version - use this for concurrent processing of multiple emails"""
-    if not email_text.strip():
-        return ""
-    
-    # Check cache first
-    cache_key = get_cache_key(email_text)
-    if cache_key in _summary_cache:
-        return _summary_cache[cache_key]
-    
-    # Truncate long emails
-    email_text = truncate_email(email_text)
-
-    user_prompt = (
-        "Summarize the following email in clear and concise bullet points. Do not return anything other than the summary, especially not something like ('Here is the summary.....')\n\n"
-        f"Email:\n{email_text}\n\nSummary:"
+    return await call_async(
+        email_text,
+        _summary_cache,
+        _SYSTEM_MSG,
+        _USER_PROMPT_PREFIX,
+        _USER_PROMPT_SUFFIX,
+        "Summary",
     )
 
-    try:
-        session = await get_aiohttp_session()  # Get shared session
-        
-        async with session.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": OPENROUTER_SITE_URL,
-                "X-Title": OPENROUTER_APP_TITLE,
-            },
-            json={
-                "model": OPENROUTER_MODEL,
-                "messages": [
-                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt},
-                ],
-                "temperature": 0.2,
-                "max_tokens": 100,
-            },
-            timeout=aiohttp.ClientTimeout(total=90)  # Increased timeout
-        ) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-            content = data["choices"][0]["message"]["content"].strip()
-            
-            # Cache the result
-            _summary_cache[cache_key] = content
-            
-            return content
-                
-    except Exception as e:
-        error_msg = f"Summary unavailable (OpenRouter error: {e})"
-        print(f">>> ERROR: {error_msg}")
-        return error_msg
-
 
 async def summarize_batch_async(email_texts: list[str]) -> list[str]:
     """Process multiple emails concurrently"""
@@ -180,64 +68,84 @@ async def summarize_batch_async(email_texts: list[str]) -> list[str]:
     return await asyncio.gather(*tasks, return_exceptions=True)
 
 
-# ============================================================================
-# SYNC VERSION (Drop-in replacement)
-# ============================================================================
+async def summarize_coalesced_async(email_texts: list[str], batch_size: int = 8) -> list[str]:
+    """
+    Summarize many emails with one OpenRouter request per `batch_size` uncached emails.
+    Better for bulk, latency-insensitive workloads than summarize_batch_async.
+    """
+    results = [""] * len(email_texts)
+    pending = []  # (index, cache_key, email_text) for cache misses
 
-def summarizer(email_text: str) -> str:
-    """Synchronous version with caching and truncation"""
-    if not email_text.strip():
-        return ""
-    
-    # Check cache first
-    cache_key = get_cache_key(email_text)
-    if cache_key in _summary_cache:
-        return _summary_cache[cache_key]
-    
-    # Truncate long emails
-    email_text = truncate_email(email_text)
+    for i, email_text in enumerate(email_texts):
+        if not email_text.strip():
+            continue
+        cache_key = get_cache_key(email_text)
+        cached = await _summary_cache.get_async(cache_key)
+        if cached is not None:
+            results[i] = cached
+            continue
+        pending.append((i, cache_key, email_text))
 
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    batch_summaries = await asyncio.gather(*(_request_summary_batch_async(b) for b in batches))
+
+    for batch, summaries in zip(batches, batch_summaries):
+        for (i, _, _), summary in zip(batch, summaries):
+            results[i] = summary
+
+    return results
+
+
+async def _request_summary_batch_async(batch: list[tuple[int, int, str]]) -> list[str]:
+    """Summarize a batch of emails in a single request, falling back to per-email calls"""
+    emails = "".join(
+        f"---\nEmail {n}:\n{truncate_email(email_text)}\n"
+        for n, (_, _, email_text) in enumerate(batch, 1)
+    )
     user_prompt = (
-        "Summarize the following email in clear and concise bullet points. Do not return anything other than the summary please. \n\n"
-        f"Email:\n{email_text}\n\nSummary:"
+        f"Summarize each of the following {len(batch)} emails separately in clear and concise bullet points. "
+        'Return a JSON object of the form {"summaries": ["...", "..."]} with exactly one summary string per email, '
+        "in the same order. Do not return anything else.\n\n"
+        f"Emails:\n{emails}"
     )
 
     try:
-        resp = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": OPENROUTER_SITE_URL,
-                "X-Title": OPENROUTER_APP_TITLE,
-            },
-            json={
-                "model": OPENROUTER_MODEL,
-                "messages": [
-                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt},
-                ],
-                "temperature": 0.2,
-                "max_tokens": 100,
-            },
-            timeout=90,  # Increased timeout
+        content = await request_async(
+            [_SYSTEM_MSG, {"role": "user", "content": user_prompt}],
+            max_tokens=100 * len(batch),
+            response_format={"type": "json_object"},
         )
-        resp.raise_for_status()
-        data = resp.json()
-        content = data["choices"][0]["message"]["content"].strip()
-        
-        # Cache the result
-        _summary_cache[cache_key] = content
-        
-        return content
-        
-    except Exception as e:
-        error_msg = f"Summary unavailable (OpenRouter error: {e})"
-        print(f">>> ERROR: {error_msg}")
-        return error_msg
+        summaries = orjson.loads(content)["summaries"]
+        if len(summaries) != len(batch) or not all(isinstance(s, str) for s in summaries):
+            raise ValueError(f"expected {len(batch)} summaries, got {len(summaries)}")
+    except Exception:
+        logger.exception("Coalesced summary failed, falling back to per-email calls")
+        return await asyncio.gather(*(summarizer_async(email_text) for _, _, email_text in batch))
+
+    summaries = [s.strip() for s in summaries]
+    await asyncio.gather(*(
+        _summary_cache.set_async(cache_key, summary) for (_, cache_key, _), summary in zip(batch, summaries)
+    ))
+
+    return summaries
+
+
+# ============================================================================
+# SYNC VERSION (Drop-in replacement)
+# ============================================================================
+
+def summarizer(email_text: str) -> str:
+    """Synchronous version with caching and truncation"""
+    return call_sync(
+        email_text,
+        _summary_cache,
+        _SYSTEM_MSG,
+        _SYNC_USER_PROMPT_PREFIX,
+        _USER_PROMPT_SUFFIX,
+        "Summary",
+    )
 
 
 def clear_cache():
     """Clear the summary cache"""
-    global _summary_cache
-    _summary_cache = {}
\ No newline at end of file
+    _summary_cache.clear()
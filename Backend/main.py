@@ -1,6 +1,9 @@
 from pathlib import Path
 from datetime import datetime, timezone
 import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, UploadFile, File, HTTPException
@@ -8,17 +11,21 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, Resource
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 from google.auth.transport.requests import Request
+import google_auth_httplib2
+from tenacity import retry, retry_if_exception, retry_if_result, stop_after_attempt, wait_random_exponential
 
 # Import ASYNC versions
 from agents.summarizer_agent import summarizer as summarize_agent, summarizer_async
 from agents.tone_agent import summarizer, summarizer_async as tone_async
 from utils.email_parser import parse_eml
+from utils.html_utils import strip_html_tags
 from models.schemas import EmailSummaryResponse
 import re
-import base64
-from bs4 import BeautifulSoup
+import binascii
 
 # Gmail API configuration
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
@@ -26,6 +33,8 @@ BASE_DIR = Path(__file__).resolve().parent
 CREDENTIALS_FILE = BASE_DIR / "credentials.json"
 TOKEN_FILE = BASE_DIR / "token.json"
 
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
 
 # Lifespan context manager for cleanup
 @asynccontextmanager
@@ -33,12 +42,10 @@ async def lifespan(app: FastAPI):
     # Startup
     print(">>> Starting up...")
     yield
-    # Shutdown - clean up aiohttp sessions
+    # Shutdown - clean up the aiohttp session shared by both agents
     print(">>> Shutting down, cleaning up...")
     from agents.summarizer_agent import close_aiohttp_session
-    from agents.tone_agent import close_aiohttp_session as close_tone_session
     await close_aiohttp_session()
-    await close_tone_session()
     print(">>> Cleanup complete")
 
 
@@ -65,46 +72,69 @@ app.add_middleware(
 
 
 # Helper Functions
-def chunk_email_text(text: str, max_chunk_chars: int = 1500) -> list[str]:
+# Emails up to this length are one chunk: summarized with a single call, no map-reduce
+MAX_CHUNK_CHARS = 1500
+
+
+def chunk_email_text(text: str, max_chunk_chars: int = MAX_CHUNK_CHARS) -> list[str]:
     """Split long email into manageable chunks with overlap"""
     if len(text) <= max_chunk_chars:
         return [text]
 
-    chunks = []
+    # Chunks are slices of the whitespace-normalized text, so no per-word joins or length sums
     words = text.split()
-    current_chunk = []
-    current_length = 0
-
+    normalized = " ".join(words)
+    starts = []
+    pos = 0
     for word in words:
-        test_length = current_length + len(word) + 1
-        if test_length > max_chunk_chars and current_chunk:
-            chunks.append(" ".join(current_chunk))
-            overlap_start = max(0, len(current_chunk) - 50)  # 50 word overlap
-            current_chunk = current_chunk[overlap_start:]
-            current_length = sum(len(w) + 1 for w in current_chunk)
-        current_chunk.append(word)
-        current_length = test_length
-    
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    
+        starts.append(pos)
+        pos += len(word) + 1
+
+    chunks = []
+    first = 0  # index of the first word in the current chunk
+    for i, word in enumerate(words):
+        if i > first and starts[i] + len(word) - starts[first] > max_chunk_chars:
+            chunks.append(normalized[starts[first]:starts[i] - 1])
+            # 50 word overlap, trimmed to half a chunk so every chunk advances by at least half the window
+            first = max(i - 50, first + 1)
+            while first < i - 1 and starts[i] - starts[first] > max_chunk_chars // 2:
+                first += 1
+    chunks.append(normalized[starts[first]:])
+
     return chunks
 
 
+def _is_valid_summary(summary: str) -> bool:
+    return bool(summary) and not summary.startswith("Summary unavailable")
+
+
 # ASYNC Map-Reduce (MUCH FASTER)
-async def map_reduce_summary_async(chunks: list[str]) -> str:
-    """Map: summarize chunks concurrently → Reduce: summarize summaries"""
+async def map_reduce_summary_async(chunks: list[str], on_first_summary=None) -> str:
+    """
+    Map: summarize chunks concurrently → Reduce: summarize summaries.
+    `on_first_summary(text)` is called with the first chunk's summary (if valid), before the reduce call.
+    """
     if not chunks:
         return ""
-    
+
     if len(chunks) == 1:
         return await summarizer_async(chunks[0])
     
     print(f">>> Map-reduce: {len(chunks)} chunks")
     
     # Map phase - ALL CHUNKS PROCESSED CONCURRENTLY
-    chunk_tasks = [summarizer_async(chunk) for chunk in chunks]
-    chunk_summaries = await asyncio.gather(*chunk_tasks, return_exceptions=True)
+    chunk_tasks = [asyncio.ensure_future(summarizer_async(chunk)) for chunk in chunks]
+    try:
+        if on_first_summary is not None:
+            # Hand out chunk 0's summary while the rest are still running. Always chunk 0, not whichever
+            # finishes first, so the result doesn't depend on completion order or cache state
+            first = (await asyncio.gather(chunk_tasks[0], return_exceptions=True))[0]
+            if isinstance(first, str) and _is_valid_summary(first):
+                on_first_summary(first)
+        chunk_summaries = await asyncio.gather(*chunk_tasks, return_exceptions=True)
+    finally:
+        for task in chunk_tasks:
+            task.cancel()  # no-op once done; stops stragglers on timeout
     
     # Filter out failures
     valid_summaries = [
@@ -124,9 +154,66 @@ async def map_reduce_summary_async(chunks: list[str]) -> str:
     return final_summary[:800]
 
 
-def get_gmail_service():
-    creds = None
-    if TOKEN_FILE.exists():
+async def summarize_with_tone_async(
+    chunks: list[str],
+    summary_timeout: float | None = None,
+    tone_timeout: float | None = None,
+) -> tuple[str, str]:
+    """
+    Summary + tone for one email. Tone is always detected on the first chunk's summary, so the
+    same email gets the same tone whether or not its summaries are cached. A single chunk is
+    summarized with one direct call; for multi-chunk emails, tone detection runs alongside the
+    rest of the map phase and the reduce call.
+    """
+    tone_task = None
+
+    def start_tone(first_summary: str):
+        nonlocal tone_task
+        tone_task = asyncio.ensure_future(tone_async(first_summary))
+
+    if len(chunks) == 1:
+        # Short email: summarizer_async has its own result cache, skip the map-reduce wrapper
+        summary_coro = summarizer_async(chunks[0])
+    else:
+        summary_coro = map_reduce_summary_async(chunks, on_first_summary=start_tone)
+
+    try:
+        summary = await asyncio.wait_for(summary_coro, timeout=summary_timeout)
+        # Single chunk (the summary is chunk 0's summary) or chunk 0 failed: get tone from the summary
+        if tone_task is None:
+            if not summary:
+                return summary, ""
+            tone_task = asyncio.ensure_future(tone_async(summary))
+        tone = await asyncio.wait_for(tone_task, timeout=tone_timeout)
+    finally:
+        if tone_task is not None:
+            tone_task.cancel()
+
+    return summary, tone
+
+
+# Cached (credentials, Gmail service); rebuilt only when the credentials stop being valid
+_service_cache: tuple[Credentials, Resource] | None = None
+_service_lock = asyncio.Lock()
+
+
+async def get_gmail_service() -> Resource:
+    global _service_cache
+    async with _service_lock:
+        if _service_cache is None or not _service_cache[0].valid:
+            _service_cache = await _run_blocking(_load_gmail_service, _service_cache)
+        return _service_cache[1]
+
+
+def _invalidate_gmail_service():
+    """Forget the cached service after token.json changes"""
+    global _service_cache
+    _service_cache = None
+
+
+def _load_gmail_service(cached: tuple[Credentials, Resource] | None) -> tuple[Credentials, Resource]:
+    creds = cached[0] if cached else None
+    if creds is None and TOKEN_FILE.exists():
         creds = Credentials.from_authorized_user_file(str(TOKEN_FILE), SCOPES)
 
     if creds and creds.expired and creds.refresh_token:
@@ -137,8 +224,135 @@ def get_gmail_service():
     if not creds or not creds.valid:
         raise HTTPException(status_code=401, detail="Not authenticated with Gmail")
 
-    service = build("gmail", "v1", credentials=creds)
-    return service
+    # Refreshed in place: the existing service already holds these credentials
+    if cached and cached[0] is creds:
+        return cached
+
+    # Bundled discovery document: no discovery HTTP fetch
+    service = build("gmail", "v1", credentials=creds, cache_discovery=False, static_discovery=True)
+    return creds, service
+
+
+# Blocking googleapiclient (httplib2) calls run here instead of on the event loop.
+# Created at import, so it is not shut down in lifespan: it outlives any single app startup/shutdown
+_gmail_executor = ThreadPoolExecutor(max_workers=16)
+_thread_local = threading.local()
+
+
+def _thread_http(credentials):
+    """httplib2.Http is not thread-safe, so each executor thread gets its own authorized connection"""
+    http = getattr(_thread_local, "http", None)
+    if http is None or http.credentials is not credentials:
+        # build_http() keeps googleapiclient's default socket timeout, so a hung call can't pin a thread
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=build_http())
+        _thread_local.http = http
+    return http
+
+
+async def _run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_gmail_executor, func, *args)
+
+
+# Below this size, parsing inline is cheaper than a thread hop
+INLINE_CPU_MAX_BYTES = 2048
+
+
+async def _run_cpu(size: int, func, *args):
+    """Run CPU-bound parsing off the event loop, unless the input is small"""
+    if size < INLINE_CPU_MAX_BYTES:
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+# Caps in-flight Gmail calls; the slot is released while backing off between retries
+GMAIL_CONCURRENCY = 8
+_gmail_semaphore = asyncio.Semaphore(GMAIL_CONCURRENCY)
+
+
+def _is_gmail_rate_limited(e: BaseException) -> bool:
+    return isinstance(e, HttpError) and e.resp.status in (429, 503)
+
+
+# Backoff shared by whole-request retries (_execute) and per-message batch retries (_fetch_messages)
+_gmail_backoff = wait_random_exponential(min=1, max=16)
+_gmail_attempts = stop_after_attempt(5)
+
+
+@retry(
+    retry=retry_if_exception(_is_gmail_rate_limited),
+    wait=_gmail_backoff,
+    stop=_gmail_attempts,
+    reraise=True,
+)
+async def _execute(request, credentials=None):
+    """Execute a googleapiclient request in the executor without blocking the event loop"""
+    credentials = credentials or request.http.credentials
+    async with _gmail_semaphore:
+        return await _run_blocking(lambda: request.execute(http=_thread_http(credentials)))
+
+
+# Gmail allows up to 100 subrequests per batch; stay well under the cap
+GMAIL_BATCH_SIZE = 50
+
+# Partial response for format="full": only the headers and text bodies the pipeline reads
+# (four levels of MIME nesting), so attachment metadata is never sent or parsed
+_FIELDS = (
+    "id,snippet,sizeEstimate,"
+    "payload(headers(name,value),mimeType,body/data,"
+    "parts(mimeType,body/data,parts(mimeType,body/data,parts(mimeType,body/data))))"
+)
+
+
+async def _fetch_messages(service, message_ids: list[str], **get_kwargs) -> dict:
+    """
+    Fetch many messages through the Gmail batch endpoint (one HTTP round trip per GMAIL_BATCH_SIZE ids).
+    Returns {message_id: message dict, or the exception raised for that message}.
+    """
+    fetched = {}
+    pending = list(message_ids)
+
+    # Per-message 429/503s inside a batch reach the callback instead of raising from _execute,
+    # so rate-limited ids are collected and re-submitted in fresh batches with the same backoff
+    @retry(
+        retry=retry_if_result(bool),
+        wait=_gmail_backoff,
+        stop=_gmail_attempts,
+        retry_error_callback=lambda _: None,
+    )
+    async def fetch_pending():
+        rate_limited = []
+
+        def on_message(request_id, response, exception):
+            fetched[request_id] = exception if exception is not None else response
+            if exception is not None and _is_gmail_rate_limited(exception):
+                rate_limited.append(request_id)
+
+        async def execute_batch(batch, batch_ids, credentials):
+            # A failed batch fails only its own messages, which then become fallback items
+            try:
+                await _execute(batch, credentials)
+            except Exception as e:
+                print(f">>> Gmail batch of {len(batch_ids)} messages failed: {e}")
+                for message_id in batch_ids:
+                    fetched[message_id] = e
+
+        batches = []
+        credentials = None
+        for start in range(0, len(pending), GMAIL_BATCH_SIZE):
+            batch_ids = pending[start:start + GMAIL_BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=on_message)
+            for message_id in batch_ids:
+                request = service.users().messages().get(userId="me", id=message_id, **get_kwargs)
+                credentials = request.http.credentials
+                batch.add(request, request_id=message_id)
+            batches.append((batch, batch_ids))
+
+        await asyncio.gather(*(execute_batch(batch, batch_ids, credentials) for batch, batch_ids in batches))
+        pending[:] = rate_limited
+        return rate_limited
+
+    await fetch_pending()
+    return fetched
 
 
 def days_to_urgency(days_left: int) -> int:
@@ -155,12 +369,17 @@ def days_to_urgency(days_left: int) -> int:
     return 1
 
 
+# base64url → standard alphabet, so binascii can decode the str directly
+_B64URL_TRANS = str.maketrans("-_", "+/")
+
+
 def _decode_part_body(body_dict: dict) -> str:
     data = body_dict.get("data")
     if not data:
         return ""
     try:
-        return base64.urlsafe_b64decode(data.encode("UTF-8")).decode("utf-8", errors="replace")
+        raw = binascii.a2b_base64(data.translate(_B64URL_TRANS) + "=" * (-len(data) % 4))
+        return raw.decode("utf-8", errors="replace")
     except Exception:
         return ""
 
@@ -176,140 +395,130 @@ def extract_plain_text_body(message: dict) -> str:
         return _decode_part_body(body)
 
     if mime_type == "text/html":
-        html = _decode_part_body(body)
-        try:
-            return BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
-        except Exception:
-            return html or ""
-
-    def walk_parts(part_list):
-        plain_candidates = []
-        html_candidates = []
-        for p in part_list or []:
-            p_mime = p.get("mimeType", "")
-            p_body = p.get("body", {})
-            p_parts = p.get("parts", [])
-
-            if p_mime == "text/plain":
-                plain_candidates.append(_decode_part_body(p_body))
-            elif p_mime == "text/html":
-                html_candidates.append(_decode_part_body(p_body))
-            
-            if p_parts:
-                sub_plain, sub_html = walk_parts(p_parts)
-                if sub_plain:
-                    plain_candidates.append(sub_plain)
-                if sub_html:
-                    html_candidates.append(sub_html)
-        
-        return " ".join(plain_candidates).strip(), " ".join(html_candidates).strip()
-
-    plain, html = walk_parts(parts)
-
-    if plain:
-        return plain
-    if html:
-        try:
-            return BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
-        except Exception:
-            return html
+        return strip_html_tags(_decode_part_body(body))
+
+    # Iterative DFS in document order: stop at the first non-empty plain text part,
+    # and only decode HTML if the message has no plain text at all
+    html_parts = []
+    stack = list(reversed(parts))
+    while stack:
+        p = stack.pop()
+        p_mime = p.get("mimeType", "")
+
+        if p_mime == "text/plain":
+            plain = _decode_part_body(p.get("body", {})).strip()
+            if plain:
+                return plain
+        elif p_mime == "text/html":
+            html_parts.append(p)
+
+        p_parts = p.get("parts")
+        if p_parts:
+            stack.extend(reversed(p_parts))
+
+    for p in html_parts:
+        html = _decode_part_body(p.get("body", {})).strip()
+        if html:
+            return strip_html_tags(html)
 
     return ""
 
 
-DATE_PATTERNS = [
-    r"\b(\d{4}-\d{1,2}-\d{1,2})\b",
-    r"\b(\d{1,2}/\d{1,2}/\d{4})\b",
-    r"\b(\d{1,2}-\d{1,2}-\d{4})\b",
-    r"\b(\d{1,2}\.\d{1,2}\.\d{4})\b",
-    r"\b((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec|"
+_MONTHS = (
+    r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec|"
     r"January|February|March|April|May|June|July|August|September|October|November|December)"
-    r"\s+\d{1,2},\s+\d{4})\b",
-    r"\b(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec|"
-    r"January|February|March|April|May|June|July|August|September|October|November|December)"
-    r"\s+\d{4})\b",
+)
+
+# (pattern, strptime formats to try for a match of that pattern)
+DATE_PATTERNS = [
+    (r"\b\d{4}-\d{1,2}-\d{1,2}\b", ("%Y-%m-%d",)),
+    (r"\b\d{1,2}/\d{1,2}/\d{4}\b", ("%m/%d/%Y", "%d/%m/%Y")),
+    (r"\b\d{1,2}-\d{1,2}-\d{4}\b", ("%m-%d-%Y", "%d-%m-%Y")),
+    (r"\b\d{1,2}\.\d{1,2}\.\d{4}\b", ("%d.%m.%Y",)),
+    (rf"\b{_MONTHS}\s+\d{{1,2}},\s+\d{{4}}\b", ("%B %d, %Y", "%b %d, %Y")),
+    (rf"\b\d{{1,2}}\s+{_MONTHS}\s+\d{{4}}\b", ("%d %B %Y", "%d %b %Y")),
 ]
 
-date_regexes = [re.compile(p) for p in DATE_PATTERNS]
+# All patterns fused into one alternation: one regex pass, m.lastgroup says which pattern matched
+_COMBINED_DATE_RE = re.compile(
+    "|".join(f"(?P<d{i}>{pattern})" for i, (pattern, _) in enumerate(DATE_PATTERNS)),
+    re.ASCII,
+)
+_DATE_FORMATS = {f"d{i}": formats for i, (_, formats) in enumerate(DATE_PATTERNS)}
 
 
 def extract_deadline_date(text: str) -> datetime | None:
     """Extract deadline date from email text"""
-    for regex in date_regexes:
-        m = regex.search(text)
-        if not m:
-            continue
-        s = m.group(1)
-        for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"):
+    for m in _COMBINED_DATE_RE.finditer(text):
+        # strptime's %b only knows "Sep", but _MONTHS also matches the common "Sept"
+        s = " ".join(m.group().split()).replace("Sept ", "Sep ")
+        for fmt in _DATE_FORMATS[m.lastgroup]:
             try:
-                dt = datetime.strptime(s, fmt)
-                return dt
+                return datetime.strptime(s, fmt)
             except ValueError:
                 continue
     return None
 
 
+def _fallback_item(msg_id: str, subject: str, summary: str) -> dict:
+    """Placeholder item for an email that could not be processed"""
+    return {
+        "id": msg_id,
+        "subject": subject,
+        "from_": "(unknown)",
+        "date": "",
+        "snippet": "",
+        "days_left": 999,
+        "urgency": 1,
+        "summary": summary,
+        "tone": "unavailable",
+    }
+
+
+# Limits how many emails are summarized at once
+EMAIL_CONCURRENCY = 5
+_email_semaphore = asyncio.Semaphore(EMAIL_CONCURRENCY)
+
+
 # Process single email with timeout protection
-async def process_single_email(msg_data, service, timeout_seconds=60):
-    """Process one email with timeout protection"""
-    try:
-        return await asyncio.wait_for(
-            _process_email_logic(msg_data, service),
-            timeout=timeout_seconds
-        )
-    except asyncio.TimeoutError:
-        print(f">>> TIMEOUT processing email {msg_data['id']}")
-        return {
-            "id": msg_data["id"],
-            "subject": "(Processing timeout)",
-            "from_": "(unknown)",
-            "date": "",
-            "snippet": "",
-            "days_left": 999,
-            "urgency": 1,
-            "summary": "⚠️ Email too large to process (timeout)",
-            "tone": "unavailable",
-        }
-    except Exception as e:
-        print(f">>> ERROR processing email {msg_data['id']}: {e}")
-        return {
-            "id": msg_data["id"],
-            "subject": "(Error)",
-            "from_": "(unknown)",
-            "date": "",
-            "snippet": "",
-            "days_left": 999,
-            "urgency": 1,
-            "summary": f"Error: {str(e)[:100]}",
-            "tone": "unavailable",
-        }
-
-
-async def _process_email_logic(msg_data, service):
+async def process_single_email(msg_data, timeout_seconds=60):
+    """Process one fetched Gmail message with timeout protection"""
+    async with _email_semaphore:
+        try:
+            return await asyncio.wait_for(
+                _process_email_logic(msg_data),
+                timeout=timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            print(f">>> TIMEOUT processing email {msg_data['id']}")
+            return _fallback_item(
+                msg_data["id"], "(Processing timeout)", "⚠️ Email too large to process (timeout)"
+            )
+        except Exception as e:
+            print(f">>> ERROR processing email {msg_data['id']}: {e}")
+            return _fallback_item(msg_data["id"], "(Error)", f"Error: {str(e)[:100]}")
+
+
+async def _process_email_logic(msg):
     """Main email processing logic"""
-    msg = (
-        service.users()
-        .messages()
-        .get(userId="me", id=msg_data["id"], format="full")
-        .execute()
-    )
-
     headers = msg.get("payload", {}).get("headers", [])
-    subject = next((h["value"] for h in headers if h["name"] == "Subject"), "(no subject)")
-    sender = next((h["value"] for h in headers if h["name"] == "From"), "(unknown sender)")
-    date_header = next((h["value"] for h in headers if h["name"] == "Date"), "")
+    # One pass over the headers; reversed so the first occurrence of a name wins, as before
+    hdr = {h["name"]: h["value"] for h in reversed(headers)}
+    subject = hdr.get("Subject", "(no subject)")
+    sender = hdr.get("From", "(unknown sender)")
+    date_header = hdr.get("Date", "")
     
     print(f">>> Processing: {subject[:60]}...")
     
     now = datetime.now(timezone.utc)
-    full_body = extract_plain_text_body(msg)
+    full_body = await _run_cpu(msg.get("sizeEstimate", 0), extract_plain_text_body, msg)
     
     # Truncate very long emails BEFORE processing
     if len(full_body) > 8000:
         print(f">>> WARNING: Large email ({len(full_body)} chars), truncating")
         full_body = full_body[:8000] + "\n\n[Email truncated due to length]"
     
-    # Deadline detection
+    # Deadline detection (bounded at 1000 chars, so it stays under the inline threshold)
     deadline_dt = extract_deadline_date(full_body[:1000])  # Only scan first 1000 chars
     if deadline_dt:
         if deadline_dt.tzinfo is None:
@@ -322,16 +531,11 @@ async def _process_email_logic(msg_data, service):
     
     # Process with async (MUCH FASTER)
     try:
-        chunks = chunk_email_text(full_body, max_chunk_chars=1500)
+        chunks = await _run_cpu(len(full_body), chunk_email_text, full_body, MAX_CHUNK_CHARS)
         print(f">>> Chunks: {len(chunks)}")
-        
-        # Process summary and tone IN PARALLEL
-        summary_task = map_reduce_summary_async(chunks)
-        summary = await asyncio.wait_for(summary_task, timeout=45)
-        
-        # Get tone from summary
-        tone_task = tone_async(summary) if summary else ""
-        tone = await asyncio.wait_for(tone_task, timeout=20) if summary else ""
+
+        # Summary and tone pipelined: tone starts on the first chunk summary
+        summary, tone = await summarize_with_tone_async(chunks, summary_timeout=45, tone_timeout=20)
         
     except asyncio.TimeoutError:
         print(">>> API timeout, using fallback")
@@ -367,6 +571,7 @@ def gmail_dev_login():
     )
     creds = flow.run_local_server(port=0)
     TOKEN_FILE.write_text(creds.to_json())
+    _invalidate_gmail_service()
     return {"message": "Gmail authenticated. token.json created."}
 
 
@@ -375,31 +580,36 @@ def refresh_token():
     """Force token refresh"""
     if TOKEN_FILE.exists():
         TOKEN_FILE.unlink()
+        _invalidate_gmail_service()
         return {"message": "Token deleted. Please visit /gmail/dev-login to re-authenticate"}
     return {"message": "No token file found"}
 
 
 @app.get("/gmail/debug-inbox")
-def debug_inbox():
+async def debug_inbox():
     """See what's actually in your inbox right now"""
-    service = get_gmail_service()
+    service = await get_gmail_service()
     
-    results = service.users().messages().list(
+    results = await _execute(service.users().messages().list(
         userId="me",
         labelIds=["INBOX"],
         maxResults=20
-    ).execute()
+    ))
     
     messages = results.get("messages", [])
     
+    fetched = await _fetch_messages(
+        service,
+        [m["id"] for m in messages[:10]],
+        format="metadata",
+        metadataHeaders=["From", "Subject", "Date"],
+    )
+    
     debug_data = []
     for m in messages[:10]:
-        msg = service.users().messages().get(
-            userId="me", 
-            id=m["id"], 
-            format="metadata",
-            metadataHeaders=["From", "Subject", "Date"]
-        ).execute()
+        msg = fetched.get(m["id"])
+        if not isinstance(msg, dict):
+            continue
         
         headers = {h["name"]: h["value"] for h in msg["payload"]["headers"]}
         
@@ -422,7 +632,7 @@ async def get_urgent_emails(
     include_promotions: bool = False
 ):
     """Get urgent emails with async processing"""
-    service = get_gmail_service()
+    service = await get_gmail_service()
     
     # Build query
     query_parts = []
@@ -436,7 +646,7 @@ async def get_urgent_emails(
     print(f">>> Fetching {max_results} emails")
     print(f">>> Query: {query}")
     
-    results = (
+    results = await _execute(
         service.users()
         .messages()
         .list(
@@ -445,7 +655,6 @@ async def get_urgent_emails(
             q=query,
             maxResults=max_results
         )
-        .execute()
     )
     
     messages = results.get("messages", [])
@@ -454,11 +663,21 @@ async def get_urgent_emails(
     if not messages:
         return {"items": []}
 
-    # Process all emails concurrently with timeout protection
-    items = []
-    for msg_data in messages:
-        item = await process_single_email(msg_data, service, timeout_seconds=60)
-        items.append(item)
+    # Fetch every message in batched round trips, then process them concurrently
+    fetched = await _fetch_messages(service, [m["id"] for m in messages], format="full", fields=_FIELDS)
+
+    async def process(msg_id):
+        msg = fetched.get(msg_id)
+        if not isinstance(msg, dict):
+            raise RuntimeError(f"Gmail fetch failed: {msg}")
+        return await process_single_email(msg, timeout_seconds=60)
+
+    results = await asyncio.gather(*(process(m["id"]) for m in messages), return_exceptions=True)
+    items = [
+        item if isinstance(item, dict)
+        else _fallback_item(msg_data["id"], "(Error)", f"Error: {str(item)[:100]}")
+        for msg_data, item in zip(messages, results)
+    ]
 
     print(f">>> ✓ All {len(items)} emails processed")
     return {"items": items}
@@ -470,10 +689,10 @@ async def summarize_email(file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".eml"):
         raise HTTPException(status_code=400, detail="Only .eml files are supported")
 
-    raw_bytes = await file.read()
-
     # parse_eml returns a dict like {"subject": ..., "body": ...}
-    parsed = parse_eml(raw_bytes)
+    # Parse straight from the spooled upload instead of reading it into memory first;
+    # large uploads roll over to disk, so the read + parse runs off the event loop
+    parsed = await _run_cpu(file.size or 0, parse_eml, file.file)
 
     # If parse_eml sometimes returns a plain string, handle both cases
     if isinstance(parsed, dict):
@@ -491,11 +710,10 @@ async def summarize_email(file: UploadFile = File(...)):
     if len(email_text) > 8000:
         email_text = email_text[:8000]
 
-    chunks = chunk_email_text(email_text, max_chunk_chars=1500)
+    chunks = await _run_cpu(len(email_text), chunk_email_text, email_text, MAX_CHUNK_CHARS)
 
     # Use async processing
-    summary = await map_reduce_summary_async(chunks)
-    tone = await tone_async(summary) if summary else ""
+    summary, tone = await summarize_with_tone_async(chunks)
 
     return EmailSummaryResponse(
         summary=summary,
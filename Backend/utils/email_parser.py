@@ -1,11 +1,16 @@
-import email
+from typing import BinaryIO
 from email import policy
+from email.parser import BytesParser
 from .html_utils import strip_html_tags
 
+# One parser reused for every .eml (message_from_bytes builds a new one per call)
+_EML_PARSER = BytesParser(policy=policy.default)
 
-def parse_eml(raw_bytes: bytes) -> dict:
+
+def parse_eml(fp: BinaryIO) -> dict:
     """
     Fully robust .eml parser for Gmail / Outlook messages.
+    Reads the message straight from a binary file object (e.g. an upload's spooled file).
     Extracts:
     - plain/text body (preferred)
     - text/html body (fallback, HTML stripped)
@@ -22,7 +27,7 @@ def parse_eml(raw_bytes: bytes) -> dict:
     }
     """
 
-    msg = email.message_from_bytes(raw_bytes, policy=policy.default)
+    msg = _EML_PARSER.parse(fp)
 
     subject = msg.get("subject", "")
     sender = msg.get("from", "")
@@ -31,8 +36,16 @@ def parse_eml(raw_bytes: bytes) -> dict:
     body_text = None
     html_text = None
 
-    # Walk through all MIME parts & extract text
-    for part in msg.walk():
+    # Walk the MIME tree in document order, visiting only text leaves
+    stack = [msg]
+    while stack:
+        part = stack.pop()
+        if part.is_multipart():
+            stack.extend(reversed(list(part.iter_parts())))
+            continue
+        if part.get_content_maintype() != "text":
+            continue
+
         content_type = part.get_content_type()
         content_disposition = str(part.get("Content-Disposition", ""))
 
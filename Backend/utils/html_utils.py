@@ -1,6 +1,15 @@
 import re
 from html import unescape
 
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # fall back to the regex stripper
+    LexborHTMLParser = None
+
+# <script>/<style> blocks (with their contents) or any single tag
+_HTML_RE = re.compile(r"(?is)<(script|style)\b.*?</\1\s*>|<[^>]+>")
+
+
 def strip_html_tags(html: str) -> str:
     """
     Removes HTML tags, scripts, styles, and decodes HTML entities.
@@ -10,16 +19,24 @@ def strip_html_tags(html: str) -> str:
     if not html:
         return ""
 
-    # Remove <script> and <style> blocks completely
-    html = re.sub(r"(?is)<(script|style).*?>.*?(</\1>)", "", html)
+    if LexborHTMLParser is not None:
+        try:
+            tree = LexborHTMLParser(html)
+            tree.strip_tags(["script", "style"])
+            # The C parser already decodes entities; just normalize whitespace
+            return " ".join((tree.text(separator=" ") or "").split())
+        except Exception:
+            pass
 
-    # Remove all remaining HTML tags
-    text = re.sub(r"(?s)<.*?>", " ", html)
+    return _strip_html_tags_regex(html)
+
+
+def _strip_html_tags_regex(html: str) -> str:
+    # One pass removes <script>/<style> blocks and every remaining tag
+    text = _HTML_RE.sub(" ", html)
 
     # Unescape HTML entities (&amp; → &, &nbsp; → space, etc)
     text = unescape(text)
 
     # Normalize whitespace
-    text = re.sub(r"\s+", " ", text).strip()
-
-    return text
+    return " ".join(text.split())